@@ -1,17 +1,48 @@
 import os
+import pickle
+import queue
+import threading
+import time
 import warnings
-from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple, Union
 
 import joblib
 import numpy as np
 import pandas as pd
+from pandas.api.types import is_extension_array_dtype, is_numeric_dtype
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.exceptions import NotFittedError
 
 warnings.filterwarnings("ignore")
 
 
-PREDICTOR_FILE_NAME = "predictor.joblib"
+PREDICTOR_FILE_NAME = "predictor.pkl"
+# File name used for predictors saved with joblib by earlier versions
+LEGACY_PREDICTOR_FILE_NAME = "predictor.joblib"
+
+# Minimum number of rows for which tree traversal is split across threads
+PARALLEL_MIN_ROWS = 100_000
+
+# Thread pool shared by all classifiers, created on first use
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _available_cpus() -> int:
+    """Return the number of CPUs this process is allowed to run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Return the shared thread pool used to traverse large batches."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_available_cpus())
+        return _executor
 
 
 class Classifier:
@@ -60,40 +91,177 @@ class Classifier:
             train_targets (pandas.Series): The labels of the training data.
         """
         self.model.fit(train_inputs, train_targets)
+        self._cache_fitted_attributes()
         self._is_trained = True
 
-    def predict(self, inputs: pd.DataFrame) -> np.ndarray:
+    def _cache_fitted_attributes(self) -> None:
+        """Cache the fitted attributes used on the prediction path.
+
+        The tree and the expected input features are stored on the instance
+        so they are not looked up through the estimator on every call. The
+        class probabilities and labels of every node of the tree are also
+        cached, so predictions become a lookup on the node ids returned by
+        tree_.apply instead of normalizing the tree values on every call.
+        """
+        feature_names = getattr(self.model, "feature_names_in_", None)
+        self._feature_names = None if feature_names is None else list(feature_names)
+        self._n_features = self.model.n_features_in_
+        self._tree = self.model.tree_
+        self._tree_apply = self._tree.apply
+        values = self._tree.value[:, 0, :]
+        normalizer = values.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        self._leaf_probs = np.ascontiguousarray(values / normalizer, dtype=np.float32)
+        self._leaf_labels = self.model.classes_.take(np.argmax(values, axis=1))
+
+    def prepare_inputs(self, inputs: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+        """Convert the given inputs into the array type used for inference.
+
+        Inputs are converted once into a C-contiguous float32 array, the dtype
+        that sklearn's tree uses internally, so the estimator does not make its
+        own float32 copy on every call. Callers passing numpy arrays bypass the
+        pandas overhead entirely.
+
+        Args:
+            inputs (Union[pandas.DataFrame, numpy.ndarray]): The input data.
+        Returns:
+            numpy.ndarray: The input data as a float32 C-contiguous array.
+        """
+        if not self._is_trained:
+            raise NotFittedError("Model is not fitted yet.")
+        if isinstance(inputs, pd.DataFrame):
+            if (
+                self._feature_names is not None
+                and list(inputs.columns) != self._feature_names
+            ):
+                raise ValueError(
+                    "The feature names should match those that were passed during fit."
+                )
+            inputs = self._frame_to_array(inputs)
+        inputs = np.ascontiguousarray(inputs, dtype=np.float32)
+        if inputs.ndim != 2 or inputs.shape[1] != self._n_features:
+            raise ValueError(
+                f"Expected a 2D input with {self._n_features} features, "
+                f"got shape {inputs.shape}."
+            )
+        # NaN is left for the tree to route, as sklearn does for missing values
+        if np.isinf(inputs).any():
+            raise ValueError(
+                "Input contains infinity or a value too large for dtype('float32')."
+            )
+        return inputs
+
+    @staticmethod
+    def _frame_to_array(frame: pd.DataFrame) -> np.ndarray:
+        """Convert a DataFrame into a numpy array with as few copies as possible.
+
+        Args:
+            frame (pandas.DataFrame): The input data.
+        Returns:
+            numpy.ndarray: The input data, not necessarily float32 or C-contiguous.
+        """
+        dtypes = frame.dtypes
+        if any(is_extension_array_dtype(dtype) for dtype in dtypes):
+            # nullable dtypes hold pd.NA, which becomes NaN for the tree
+            return frame.to_numpy(dtype=np.float32, na_value=np.nan)
+        if dtypes.nunique() == 1 and is_numeric_dtype(dtypes.iloc[0]):
+            # A frame with a single numeric dtype is backed by a single block,
+            # so this is a zero-copy (usually Fortran-ordered) view; the cast in
+            # prepare_inputs then converts and reorders it in one pass.
+            return frame.to_numpy(copy=False)
+        # Mixed dtypes have to be interleaved anyway, so do it straight into
+        # float32.
+        return frame.to_numpy(dtype=np.float32)
+
+    def _apply(self, inputs: np.ndarray) -> np.ndarray:
+        """Return the id of the leaf each sample ends up in.
+
+        Large batches are split into one chunk per available CPU and traversed
+        in the shared thread pool: the tree is read-only and tree_.apply
+        releases the GIL.
+
+        Args:
+            inputs (numpy.ndarray): The input data, as returned by prepare_inputs.
+        Returns:
+            numpy.ndarray: The leaf ids of the samples.
+        """
+        if inputs.shape[0] < PARALLEL_MIN_ROWS:
+            return self._tree_apply(inputs)
+        n_jobs = _available_cpus()
+        if n_jobs == 1:
+            return self._tree_apply(inputs)
+        chunks = np.array_split(inputs, n_jobs)
+        return np.concatenate(list(_get_executor().map(self._tree_apply, chunks)))
+
+    def predict(self, inputs: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
         """Predict class labels for the given data.
 
         Args:
-            inputs (pandas.DataFrame): The input data.
+            inputs (Union[pandas.DataFrame, numpy.ndarray]): The input data.
         Returns:
             numpy.ndarray: The predicted class labels.
         """
-        return self.model.predict(inputs)
+        # The label of each leaf is decided once at fit time, so no probability
+        # array is materialized here: a single gather on the leaf ids.
+        inputs = self.prepare_inputs(inputs)
+        leaf_ids = self._apply(inputs)
+        return self._leaf_labels[leaf_ids]
 
-    def predict_proba(self, inputs: pd.DataFrame) -> np.ndarray:
+    def predict_proba(self, inputs: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
         """Predict class probabilities for the given data.
 
         Args:
-            inputs (pandas.DataFrame): The input data.
+            inputs (Union[pandas.DataFrame, numpy.ndarray]): The input data.
         Returns:
             numpy.ndarray: The predicted class probabilities.
         """
-        return self.model.predict_proba(inputs)
+        inputs = self.prepare_inputs(inputs)
+        leaf_ids = self._apply(inputs)
+        return self._leaf_probs[leaf_ids]
+
+    def predict_labels_and_proba(
+        self, inputs: Union[pd.DataFrame, np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Predict class labels and class probabilities together.
+
+        Both are looked up from a single traversal of the tree.
+
+        Args:
+            inputs (Union[pandas.DataFrame, numpy.ndarray]): The input data.
+        Returns:
+            Tuple[numpy.ndarray, numpy.ndarray]: The predicted class labels and
+                class probabilities.
+        """
+        inputs = self.prepare_inputs(inputs)
+        leaf_ids = self._apply(inputs)
+        return self._leaf_labels[leaf_ids], self._leaf_probs[leaf_ids]
 
-    def evaluate(self, test_inputs: pd.DataFrame, test_targets: pd.Series) -> float:
+    def evaluate(
+        self,
+        test_inputs: Union[pd.DataFrame, np.ndarray],
+        test_targets: Union[pd.Series, np.ndarray],
+    ) -> float:
         """Evaluate the binary classifier and return the accuracy.
 
         Args:
-            test_inputs (pandas.DataFrame): The features of the test data.
-            test_targets (pandas.Series): The labels of the test data.
+            test_inputs (Union[pandas.DataFrame, numpy.ndarray]): The features of
+                the test data.
+            test_targets (Union[pandas.Series, numpy.ndarray]): The labels of the
+                test data.
         Returns:
             float: The accuracy of the binary classifier.
         """
-        if self.model is not None:
-            return self.model.score(test_inputs, test_targets)
-        raise NotFittedError("Model is not fitted yet.")
+        targets = np.asarray(test_targets).reshape(-1)
+        labels = self.predict(test_inputs)
+        if labels.shape[0] == 0:
+            raise ValueError("Cannot evaluate the model on empty test data.")
+        if labels.shape[0] != targets.shape[0]:
+            raise ValueError(
+                f"Found {labels.shape[0]} test samples but {targets.shape[0]} "
+                "test targets."
+            )
+        correct = np.count_nonzero(labels == targets)
+        return correct / labels.shape[0]
 
     def save(self, model_dir_path: str) -> None:
         """Save the binary classifier to disk.
@@ -103,7 +271,10 @@ class Classifier:
         """
         if not self._is_trained:
             raise NotFittedError("Model is not fitted yet.")
-        joblib.dump(self, os.path.join(model_dir_path, PREDICTOR_FILE_NAME))
+        # The wrapper only holds a small tree and its leaf tables, so plain
+        # pickle is used; joblib's per-array handling only slows loading down.
+        with open(os.path.join(model_dir_path, PREDICTOR_FILE_NAME), "wb") as file:
+            pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
 
     @classmethod
     def load(cls, model_dir_path: str) -> "Classifier":
@@ -114,7 +285,16 @@ class Classifier:
         Returns:
             Classifier: A new instance of the loaded binary classifier.
         """
-        model = joblib.load(os.path.join(model_dir_path, PREDICTOR_FILE_NAME))
+        legacy_file_path = os.path.join(model_dir_path, LEGACY_PREDICTOR_FILE_NAME)
+        file_path = os.path.join(model_dir_path, PREDICTOR_FILE_NAME)
+        if not os.path.exists(file_path) and os.path.exists(legacy_file_path):
+            model = joblib.load(legacy_file_path)
+        else:
+            with open(file_path, "rb") as file:
+                model = pickle.load(file)
+        # legacy models were saved before the fitted attributes were cached
+        if model._is_trained and not hasattr(model, "_tree_apply"):
+            model._cache_fitted_attributes()
         return model
 
     def __str__(self):
@@ -126,6 +306,138 @@ class Classifier:
         )
 
 
+class BatchPredictor:
+    """Groups concurrent prediction requests into batched classifier calls.
+
+    Requests submitted from any thread are queued; a worker thread drains up to
+    `max_batch_size` rows, waiting at most `max_wait_ms` after the first
+    request, and answers all of them with a single tree traversal. This spreads
+    the fixed per-call overhead over the whole batch.
+    """
+
+    def __init__(
+        self,
+        classifier: Classifier,
+        max_batch_size: int = 256,
+        max_wait_ms: float = 5.0,
+    ):
+        """Construct a new batch predictor and start its worker thread.
+
+        Args:
+            classifier (Classifier): The trained classifier model.
+            max_batch_size (int, optional): The maximum number of rows to
+                predict in one call. Defaults to 256.
+            max_wait_ms (float, optional): The maximum time in milliseconds to
+                wait for more requests after the first one of a batch.
+                Defaults to 5.0.
+        """
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(
+        self, data: Union[pd.DataFrame, np.ndarray], return_probs: bool = False
+    ) -> Future:
+        """Queue the given data for prediction.
+
+        Args:
+            data (Union[pd.DataFrame, np.ndarray]): The input data.
+            return_probs (bool): Whether to return class probabilities or labels.
+                Defaults to False.
+
+        Returns:
+            Future: A future resolving to the predicted classes or class
+                probabilities.
+
+        Raises:
+            RuntimeError: If the batch predictor has been closed.
+        """
+        # validate in the caller's thread so input errors are raised here
+        inputs = self.classifier.prepare_inputs(data)
+        if inputs is data:
+            # the batch is read later by the worker, so it must not share the
+            # caller's buffer
+            inputs = inputs.copy()
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Cannot submit requests to a closed BatchPredictor.")
+            self._queue.put((inputs, return_probs, future))
+        return future
+
+    def predict(
+        self, data: Union[pd.DataFrame, np.ndarray], return_probs: bool = False
+    ) -> np.ndarray:
+        """Predict class labels or probabilities for the given data.
+
+        Args:
+            data (Union[pd.DataFrame, np.ndarray]): The input data.
+            return_probs (bool): Whether to return class probabilities or labels.
+                Defaults to False.
+
+        Returns:
+            np.ndarray: The predicted classes or class probabilities.
+        """
+        return self.submit(data, return_probs=return_probs).result()
+
+    def close(self) -> None:
+        """Stop the worker thread once the queued requests are answered.
+
+        Calling it again has no effect.
+        """
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+        self._worker.join()
+
+    def _run(self) -> None:
+        """Collect queued requests into batches until closed."""
+        stop = False
+        while not stop:
+            request = self._queue.get()
+            if request is None:
+                return
+            batch = [request]
+            n_rows = request[0].shape[0]
+            deadline = time.monotonic() + self.max_wait_ms / 1000
+            while n_rows < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+                n_rows += request[0].shape[0]
+            self._predict_batch(batch)
+
+    def _predict_batch(self, batch: list) -> None:
+        """Predict all requests of a batch and resolve their futures."""
+        try:
+            labels, probs = self.classifier.predict_labels_and_proba(
+                np.vstack([item[0] for item in batch])
+            )
+        except Exception as exc:
+            for _, _, future in batch:
+                future.set_exception(exc)
+            return
+        start = 0
+        for inputs, return_probs, future in batch:
+            end = start + inputs.shape[0]
+            future.set_result(probs[start:end] if return_probs else labels[start:end])
+            start = end
+
+
 def train_predictor_model(
     train_inputs: pd.DataFrame, train_targets: pd.Series, hyperparameters: dict
 ) -> Classifier:
@@ -146,20 +458,28 @@ def train_predictor_model(
 
 
 def predict_with_model(
-    classifier: Classifier, data: pd.DataFrame, return_probs=False
+    classifier: Classifier,
+    data: Union[pd.DataFrame, np.ndarray],
+    return_probs=False,
+    batch_predictor: Optional[BatchPredictor] = None,
 ) -> np.ndarray:
     """
     Predict class probabilities for the given data.
 
     Args:
         classifier (Classifier): The classifier model.
-        data (pd.DataFrame): The input data.
+        data (Union[pd.DataFrame, np.ndarray]): The input data.
         return_probs (bool): Whether to return class probabilities or labels.
             Defaults to True.
+        batch_predictor (BatchPredictor, optional): If given, the request is
+            dispatched through it to be batched with concurrent requests.
+            Defaults to None.
 
     Returns:
         np.ndarray: The predicted classes or class probabilities.
     """
+    if batch_predictor is not None:
+        return batch_predictor.predict(data, return_probs=return_probs)
     if return_probs:
         return classifier.predict_proba(data)
     return classifier.predict(data)
@@ -192,15 +512,17 @@ def load_predictor_model(predictor_dir_path: str) -> Classifier:
 
 
 def evaluate_predictor_model(
-    model: Classifier, x_test: pd.DataFrame, y_test: pd.Series
+    model: Classifier,
+    x_test: Union[pd.DataFrame, np.ndarray],
+    y_test: Union[pd.Series, np.ndarray],
 ) -> float:
     """
     Evaluate the classifier model and return the accuracy.
 
     Args:
         model (Classifier): The classifier model.
-        x_test (pd.DataFrame): The features of the test data.
-        y_test (pd.Series): The labels of the test data.
+        x_test (Union[pd.DataFrame, np.ndarray]): The features of the test data.
+        y_test (Union[pd.Series, np.ndarray]): The labels of the test data.
 
     Returns:
         float: The accuracy of the classifier model.
@@ -1,5 +1,7 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 
+import joblib
 import numpy as np
 import pandas as pd
 import pytest
@@ -7,7 +9,9 @@ from sklearn.datasets import make_classification
 from sklearn.exceptions import NotFittedError
 from sklearn.linear_model import LogisticRegression
 
+from src.prediction import predictor_model
 from src.prediction.predictor_model import (
+    BatchPredictor,
     Classifier,
     evaluate_predictor_model,
     load_predictor_model,
@@ -87,6 +91,186 @@ def test_fit_predict_evaluate(classifier, synthetic_data):
     assert 0 <= accuracy <= 1
 
 
+def test_predict_with_ndarray_inputs(classifier, synthetic_data):
+    """
+    Test that numpy array inputs give the same results as the equivalent
+    DataFrame inputs.
+    """
+    train_X, train_y, test_X, test_y = synthetic_data
+    classifier.fit(train_X, train_y)
+    test_arr = test_X.to_numpy()
+
+    assert np.array_equal(classifier.predict(test_arr), classifier.predict(test_X))
+    assert np.array_equal(
+        classifier.predict_proba(test_arr), classifier.predict_proba(test_X)
+    )
+    assert classifier.evaluate(test_arr, test_y.to_numpy()) == classifier.evaluate(
+        test_X, test_y
+    )
+
+
+def test_predict_with_nullable_dtype_inputs(classifier, synthetic_data):
+    """
+    Test that DataFrames with nullable extension dtypes, including missing
+    values, give the same results as the wrapped sklearn estimator.
+    """
+    train_X, train_y, test_X, _ = synthetic_data
+    train_X = train_X.round()
+    test_X = test_X.round()
+    classifier.fit(train_X, train_y)
+    nullable_X = test_X.astype("Int64")
+    nullable_X.iloc[0, 0] = pd.NA
+
+    assert np.array_equal(
+        classifier.predict(nullable_X), classifier.model.predict(nullable_X)
+    )
+    assert np.allclose(
+        classifier.predict_proba(nullable_X), classifier.model.predict_proba(nullable_X)
+    )
+
+
+def test_evaluate_with_column_vector_targets(classifier, synthetic_data):
+    """
+    Test that column-vector targets give the same accuracy as 1D targets.
+    """
+    train_X, train_y, test_X, test_y = synthetic_data
+    classifier.fit(train_X, train_y)
+    column_y = test_y.to_numpy()[:, None]
+
+    assert classifier.evaluate(test_X, column_y) == classifier.evaluate(test_X, test_y)
+    assert classifier.evaluate(test_X, column_y) == classifier.model.score(
+        test_X, test_y
+    )
+
+
+def test_evaluate_with_invalid_targets_fails(classifier, synthetic_data):
+    """
+    Test that evaluating on empty data or on targets whose length does not match
+    the inputs raises a ValueError.
+    """
+    train_X, train_y, test_X, test_y = synthetic_data
+    classifier.fit(train_X, train_y)
+    with pytest.raises(ValueError):
+        classifier.evaluate(test_X, test_y[:-1])
+    with pytest.raises(ValueError):
+        classifier.evaluate(test_X[:0], test_y[:0])
+
+
+def test_predict_with_mixed_dtype_inputs(classifier, synthetic_data):
+    """
+    Test that DataFrames with mixed column dtypes give the same results as the
+    equivalent float DataFrame.
+    """
+    train_X, train_y, test_X, _ = synthetic_data
+    train_X = train_X.round()
+    test_X = test_X.round()
+    classifier.fit(train_X, train_y)
+    mixed_X = test_X.astype({test_X.columns[0]: np.int64})
+    assert mixed_X.dtypes.nunique() == 2
+
+    assert np.array_equal(classifier.predict(mixed_X), classifier.predict(test_X))
+    assert np.array_equal(
+        classifier.predict_proba(mixed_X), classifier.predict_proba(test_X)
+    )
+
+
+def test_predict_matches_sklearn(classifier, synthetic_data):
+    """
+    Test that the predictions match those of the wrapped sklearn estimator.
+    """
+    train_X, train_y, test_X, test_y = synthetic_data
+    classifier.fit(train_X, train_y)
+
+    assert np.array_equal(classifier.predict(test_X), classifier.model.predict(test_X))
+    assert np.allclose(
+        classifier.predict_proba(test_X), classifier.model.predict_proba(test_X)
+    )
+    assert classifier.evaluate(test_X, test_y) == classifier.model.score(test_X, test_y)
+
+
+def test_predict_in_parallel_chunks(monkeypatch, classifier, synthetic_data):
+    """
+    Test that splitting the batch across threads gives the same results as the
+    sequential path.
+    """
+    train_X, train_y, test_X, _ = synthetic_data
+    classifier.fit(train_X, train_y)
+    expected_labels = classifier.predict(test_X)
+    expected_probs = classifier.predict_proba(test_X)
+
+    monkeypatch.setattr(predictor_model, "PARALLEL_MIN_ROWS", 1)
+    monkeypatch.setattr(predictor_model, "_available_cpus", lambda: 3)
+    assert np.array_equal(classifier.predict(test_X), expected_labels)
+    assert np.array_equal(classifier.predict_proba(test_X), expected_probs)
+
+
+def test_predict_with_mismatched_columns_fails(classifier, synthetic_data):
+    """
+    Test that predicting on a DataFrame whose columns differ from the training
+    columns raises a ValueError.
+    """
+    train_X, train_y, test_X, _ = synthetic_data
+    classifier.fit(train_X, train_y)
+    with pytest.raises(ValueError):
+        classifier.predict(test_X[test_X.columns[::-1]])
+
+
+def test_predict_with_wrong_number_of_features_fails(classifier, synthetic_data):
+    """
+    Test that predicting on inputs with the wrong number of features raises a
+    ValueError.
+    """
+    train_X, train_y, test_X, _ = synthetic_data
+    classifier.fit(train_X, train_y)
+    with pytest.raises(ValueError):
+        classifier.predict(test_X.to_numpy()[:, :-1])
+
+
+def test_predict_with_infinite_inputs_fails(classifier, synthetic_data):
+    """
+    Test that predicting on inputs that are infinite, or too large for float32,
+    raises a ValueError.
+    """
+    train_X, train_y, test_X, _ = synthetic_data
+    classifier.fit(train_X, train_y)
+    for value in [np.inf, 1e300]:
+        invalid_X = test_X.copy()
+        invalid_X.iloc[0, 0] = value
+        with pytest.raises(ValueError):
+            classifier.predict(invalid_X)
+
+
+def test_untrained_predict_fails(classifier, synthetic_data):
+    """
+    Test that predicting with an untrained classifier raises NotFittedError.
+    """
+    _, _, test_X, _ = synthetic_data
+    with pytest.raises(NotFittedError):
+        classifier.predict(test_X)
+
+
+def test_untrained_evaluate_fails(classifier, synthetic_data):
+    """
+    Test that evaluating an untrained classifier raises NotFittedError.
+    """
+    _, _, test_X, test_y = synthetic_data
+    with pytest.raises(NotFittedError):
+        classifier.evaluate(test_X, test_y)
+
+
+def test_predict_labels_and_proba(classifier, synthetic_data):
+    """
+    Test that labels and probabilities predicted together match those of
+    'predict' and 'predict_proba'.
+    """
+    train_X, train_y, test_X, _ = synthetic_data
+    classifier.fit(train_X, train_y)
+    labels, probs = classifier.predict_labels_and_proba(test_X)
+
+    assert np.array_equal(labels, classifier.predict(test_X))
+    assert np.array_equal(probs, classifier.predict_proba(test_X))
+
+
 def test_save_load(tmpdir, classifier, synthetic_data, hyperparameters):
     """
     Test if the save and load methods work correctly and if the loaded model has the
@@ -121,6 +305,40 @@ def test_save_load(tmpdir, classifier, synthetic_data, hyperparameters):
     assert accuracy == classifier.evaluate(test_X, test_y)
 
 
+def test_load_legacy_joblib_model(tmpdir, classifier, synthetic_data):
+    """
+    Test that a model saved with joblib under the legacy file name, without the
+    cached fitted attributes, is loaded with those attributes rebuilt and
+    predicts the same as the original.
+    """
+    train_X, train_y, test_X, _ = synthetic_data
+    classifier.fit(train_X, train_y)
+    expected = classifier.predict_proba(test_X)
+
+    # reduce the instance to the state saved by earlier versions
+    for attribute in [
+        "_feature_names",
+        "_n_features",
+        "_tree",
+        "_tree_apply",
+        "_leaf_probs",
+        "_leaf_labels",
+    ]:
+        delattr(classifier, attribute)
+    assert set(vars(classifier)) == {
+        "min_samples_split",
+        "min_samples_leaf",
+        "model",
+        "_is_trained",
+    }
+    model_dir_path = tmpdir.mkdir("model")
+    joblib.dump(classifier, os.path.join(model_dir_path, "predictor.joblib"))
+
+    loaded_clf = Classifier.load(model_dir_path)
+    assert np.array_equal(loaded_clf.predict_proba(test_X), expected)
+    assert np.array_equal(loaded_clf.predict(test_X), loaded_clf.model.predict(test_X))
+
+
 def test_accuracy_compared_to_logistic_regression(classifier, synthetic_data):
     """
     Test if the accuracy of the classifier is close enough to the accuracy of a
@@ -196,6 +414,100 @@ def test_predict_with_model(synthetic_data, hyperparameters):
     assert predictions.shape[0] == test_X.shape[0]
 
 
+def test_predict_with_model_batch_predictor(synthetic_data, hyperparameters):
+    """
+    Test that 'predict_with_model' dispatched through a BatchPredictor returns
+    the same predictions as the classifier.
+    """
+    train_X, train_y, test_X, _ = synthetic_data
+    classifier = train_predictor_model(train_X, train_y, hyperparameters)
+    batch_predictor = BatchPredictor(classifier)
+    try:
+        predictions = predict_with_model(
+            classifier, test_X, batch_predictor=batch_predictor
+        )
+        proba_predictions = predict_with_model(
+            classifier, test_X, return_probs=True, batch_predictor=batch_predictor
+        )
+    finally:
+        batch_predictor.close()
+
+    assert np.array_equal(predictions, classifier.predict(test_X))
+    assert np.array_equal(proba_predictions, classifier.predict_proba(test_X))
+
+
+def test_batch_predictor_concurrent_requests(synthetic_data, hyperparameters):
+    """
+    Test that concurrent single-row requests batched together each get their own
+    predictions back.
+    """
+    train_X, train_y, test_X, _ = synthetic_data
+    classifier = train_predictor_model(train_X, train_y, hyperparameters)
+    rows = [test_X.iloc[[i]] for i in range(test_X.shape[0])]
+    batch_predictor = BatchPredictor(classifier, max_batch_size=8, max_wait_ms=20)
+    try:
+        with ThreadPoolExecutor(max_workers=len(rows)) as executor:
+            probs = list(
+                executor.map(
+                    lambda row: batch_predictor.predict(row, return_probs=True), rows
+                )
+            )
+    finally:
+        batch_predictor.close()
+
+    assert np.array_equal(np.vstack(probs), classifier.predict_proba(test_X))
+
+
+def test_batch_predictor_invalid_inputs_fail(synthetic_data, hyperparameters):
+    """
+    Test that invalid inputs submitted to a BatchPredictor raise a ValueError
+    in the caller.
+    """
+    train_X, train_y, test_X, _ = synthetic_data
+    classifier = train_predictor_model(train_X, train_y, hyperparameters)
+    batch_predictor = BatchPredictor(classifier)
+    try:
+        with pytest.raises(ValueError):
+            batch_predictor.predict(test_X.to_numpy()[:, :-1])
+    finally:
+        batch_predictor.close()
+
+
+def test_batch_predictor_copies_submitted_arrays(synthetic_data, hyperparameters):
+    """
+    Test that changing a float32 array after submitting it does not change the
+    predictions returned for it.
+    """
+    train_X, train_y, test_X, _ = synthetic_data
+    classifier = train_predictor_model(train_X, train_y, hyperparameters)
+    test_arr = np.ascontiguousarray(test_X.to_numpy(), dtype=np.float32)
+    expected = classifier.predict_proba(test_arr)
+    batch_predictor = BatchPredictor(classifier, max_wait_ms=200)
+    try:
+        future = batch_predictor.submit(test_arr, return_probs=True)
+        test_arr[:] = np.inf
+        probs = future.result()
+    finally:
+        batch_predictor.close()
+
+    assert np.array_equal(probs, expected)
+
+
+def test_batch_predictor_submit_after_close_fails(synthetic_data, hyperparameters):
+    """
+    Test that submitting to a closed BatchPredictor raises a RuntimeError and
+    that closing it again has no effect.
+    """
+    train_X, train_y, test_X, _ = synthetic_data
+    classifier = train_predictor_model(train_X, train_y, hyperparameters)
+    batch_predictor = BatchPredictor(classifier)
+    batch_predictor.close()
+    batch_predictor.close()
+
+    with pytest.raises(RuntimeError):
+        batch_predictor.submit(test_X)
+
+
 def test_save_predictor_model(tmpdir, synthetic_data, hyperparameters):
     """
     Test that the 'save_predictor_model' function correctly saves a Classifierinstance